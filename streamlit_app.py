@@ -3,7 +3,11 @@
 # - Auto-retry without provider if provider blocks the route
 # - Clear instructions in UI
 
+import math
 import os
+import re
+import time
+from collections import deque
 from typing import Optional
 
 import streamlit as st
@@ -16,24 +20,50 @@ except Exception:
 
 st.set_page_config(page_title="Text → Video", page_icon="🎬", layout="centered")
 
+# Default read timeout (seconds) for inference calls; video runs can take minutes
+DEFAULT_TIMEOUT = 600
+# Videos kept in the session gallery (oldest dropped first)
+GALLERY_SIZE = 4
+# A repeat Generate click this many seconds after a success counts as a double click
+DOUBLE_CLICK_WINDOW = 5
+# Error text that means the provider refused this route
+PROVIDER_BLOCKED = re.compile(r"not allowed to post|route", re.IGNORECASE)
+
 def get_hf_token() -> Optional[str]:
     return st.secrets.get("HF_TOKEN", os.getenv("HF_TOKEN"))
 
 def get_hf_provider() -> Optional[str]:
     return st.secrets.get("HF_PROVIDER", os.getenv("HF_PROVIDER"))
 
+def get_hf_timeout() -> float:
+    raw = st.secrets.get("HF_TIMEOUT", os.getenv("HF_TIMEOUT"))
+    if raw is None or str(raw).strip() == "":
+        return DEFAULT_TIMEOUT
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        value = 0.0
+    if not (math.isfinite(value) and value > 0):
+        st.sidebar.warning(f"Ignoring invalid HF_TIMEOUT {raw!r}; using {DEFAULT_TIMEOUT} seconds.")
+        return DEFAULT_TIMEOUT
+    return value
+
 @st.cache_resource(show_spinner=False)
-def get_client(token: str, provider: Optional[str] = None):
+def get_client(token: str, provider: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT):
     if provider:
-        return InferenceClient(provider=provider, api_key=token)
-    return InferenceClient(token=token)
+        return InferenceClient(provider=provider, api_key=token, timeout=timeout)
+    return InferenceClient(token=token, timeout=timeout)
 
-def demo_video_bytes() -> bytes:
-    # Read the bundled demo asset
+@st.cache_data(show_spinner=False)
+def read_demo_video() -> bytes:
+    # Read the bundled demo asset; errors propagate so a failed read is not cached
     path = os.path.join(os.path.dirname(__file__), "assets", "demo.mp4")
+    with open(path, "rb") as f:
+        return f.read()
+
+def demo_video_bytes() -> bytes:
     try:
-        with open(path, "rb") as f:
-            return f.read()
+        return read_demo_video()
     except Exception:
         return b""
 
@@ -43,6 +73,7 @@ st.sidebar.caption("Set **HF_TOKEN** in Secrets. Optional: **HF_PROVIDER** (try
 
 token = get_hf_token()
 provider = get_hf_provider()
+timeout = get_hf_timeout()
 status = "✅ Found" if token else "⚠️ Not set (demo mode)"
 st.sidebar.write(f"**Token:** {status}" + (f" (provider: {provider})" if provider else ""))
 
@@ -53,55 +84,78 @@ st.sidebar.caption("If you get a 'Not allowed to POST' error, clear HF_PROVIDER
 
 # ---- Main
 st.title("🎬 Text → Video")
-prompt = st.text_area("Describe the video you want:", "A young man walking on the street", height=80)
-
-c1, c2 = st.columns([1,1])
-generate = c1.button("Generate", type="primary", use_container_width=True)
-clear = c2.button("Clear Gallery", use_container_width=True)
-
-if "gallery" not in st.session_state:
-    st.session_state.gallery = []
 
-if clear:
-    st.session_state.gallery = []
-    st.experimental_rerun()
-
-if generate and prompt.strip():
-    with st.spinner("Creating video... (may take up to a minute)"):
-        if not token or not HF_AVAILABLE:
-            st.info("Demo mode: add HF_TOKEN to run with a real model.")
-            vb = demo_video_bytes()
+@st.fragment
+def generation_panel(token: Optional[str], provider: Optional[str], model: str, timeout: float):
+    # Widget interactions in here rerun only this panel, not the sidebar
+    prompt = st.text_area("Describe the video you want:", "A young man walking on the street", height=80)
+
+    c1, c2 = st.columns([1,1])
+    generate = c1.button("Generate", type="primary", use_container_width=True)
+    clear = c2.button("Clear Gallery", use_container_width=True)
+
+    # Sessions started before the gallery became a deque may still hold a newest-first list
+    if not isinstance(st.session_state.get("gallery"), deque):
+        old = list(st.session_state.get("gallery") or [])[:GALLERY_SIZE]
+        st.session_state.gallery = deque(old, maxlen=GALLERY_SIZE)
+
+    if clear:
+        st.session_state.gallery.clear()
+        st.session_state.pop("last_key", None)
+
+    if generate and prompt.strip():
+        key = (model, prompt.strip())
+        last = st.session_state.get("last_key")
+        if (st.session_state.gallery and last and last[0] == key
+                and time.monotonic() - last[1] < DOUBLE_CLICK_WINDOW):
+            # Double click on the same request: reuse the result it just produced
+            vb = st.session_state.gallery[0]
         else:
-            try:
-                client = get_client(token, provider)
-                out = client.text_to_video(prompt.strip(), model=model)
-                vb = out if isinstance(out, (bytes, bytearray)) else out.read()
-            except Exception as e:
-                msg = str(e)
-                # Retry without provider if the route is blocked
-                if provider and ("Not allowed to POST" in msg or "route" in msg.lower()):
+            ok = False
+            with st.spinner("Creating video... (this can take several minutes)"):
+                if not token or not HF_AVAILABLE:
+                    st.info("Demo mode: add HF_TOKEN to run with a real model.")
+                    vb = demo_video_bytes()
+                else:
                     try:
-                        st.info("Provider blocked this route; retrying with default router…")
-                        client2 = get_client(token, None)
-                        out = client2.text_to_video(prompt.strip(), model=model)
+                        client = get_client(token, provider, timeout)
+                        out = client.text_to_video(prompt.strip(), model=model)
                         vb = out if isinstance(out, (bytes, bytearray)) else out.read()
-                    except Exception as e2:
-                        st.error(f"Generation failed: {e2}")
-                        vb = demo_video_bytes()
-                else:
-                    st.error(f"Generation failed: {e}")
-                    vb = demo_video_bytes()
+                        ok = True
+                    except Exception as e:
+                        msg = str(e)
+                        # Retry without provider if the route is blocked
+                        if provider and PROVIDER_BLOCKED.search(msg):
+                            try:
+                                st.info("Provider blocked this route; retrying with default router…")
+                                client2 = get_client(token, None, timeout)
+                                out = client2.text_to_video(prompt.strip(), model=model)
+                                vb = out if isinstance(out, (bytes, bytearray)) else out.read()
+                                ok = True
+                            except Exception as e2:
+                                st.error(f"Generation failed: {e2}")
+                                vb = demo_video_bytes()
+                        else:
+                            st.error(f"Generation failed: {e}")
+                            vb = demo_video_bytes()
+
+            if vb:
+                st.session_state.gallery.appendleft(vb)
+                st.session_state.last_key = (key, time.monotonic()) if ok else None
+            else:
+                st.session_state.last_key = None
 
         if vb:
             st.video(vb)
-            st.session_state.gallery.insert(0, vb)
             st.download_button("Download video", data=vb, file_name="generation.mp4", mime="video/mp4", use_container_width=True)
         else:
             st.warning("Could not render demo video; please check your token and try again.")
 
-if st.session_state.gallery:
-    st.subheader("Session gallery")
-    for i, vb in enumerate(st.session_state.gallery[:4], 1):
-        st.video(vb)
+    if st.session_state.gallery:
+        st.subheader("Session gallery")
+        for i, vb in enumerate(st.session_state.gallery, 1):
+            st.video(vb)
+
+generation_panel(token, provider, model, timeout)
 
 st.caption("Powered by Hugging Face Inference • Streamlit • Made by Christopher + Animaeus")